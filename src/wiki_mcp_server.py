@@ -6,29 +6,48 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import sys
+import asyncio
+import base64
 import datetime
 import json
 import hashlib
 import logging
 import ast
 import re
+import time
+import functools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Callable, Awaitable, AsyncIterator, ParamSpec, TypeVar
 from dataclasses import dataclass
 
 import httpx
+import orjson
 from fastmcp import FastMCP
 from slugify import slugify
 import markdown
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, select, delete, func, Column, Integer, String, DateTime, Text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.exc import SQLAlchemyError
 from tenacity import retry, stop_after_attempt, wait_exponential
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Release pooled HTTP and database connections on the server's own event loop at shutdown."""
+    try:
+        yield
+    finally:
+        await wikijs.aclose()
+        await async_engine.dispose()
+
 # Create FastMCP server
-mcp = FastMCP("Wiki.js Integration")
+mcp = FastMCP("Wiki.js Integration", lifespan=server_lifespan)
 
 # Configuration
 class Settings(BaseSettings):
@@ -67,7 +86,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Database models
-Base = declarative_base()
+Base: Any = declarative_base()
 
 class FileMapping(Base):
     __tablename__ = 'file_mappings'
@@ -78,7 +97,7 @@ class FileMapping(Base):
     relationship_type = Column(String, nullable=False)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
     file_hash = Column(String)
-    repository_root = Column(String, default='')
+    repository_root = Column(String, default='', index=True)
     space_name = Column(String, default='')
 
 class RepositoryContext(Base):
@@ -90,30 +109,90 @@ class RepositoryContext(Base):
     space_id = Column(Integer)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
 
+class FileHashCache(Base):
+    __tablename__ = 'file_hash_cache'
+    
+    path = Column(String, primary_key=True)
+    mtime_ns = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    hash = Column(String, nullable=False)
+
 # Database setup
 engine = create_engine(f"sqlite:///{settings.WIKIJS_MCP_DB}")
 Base.metadata.create_all(engine)
+# create_all skips indexes added to tables that already exist
+for index in FileMapping.__table__.indexes:
+    index.create(engine, checkfirst=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pooled async engine for tools running on the event loop. aiosqlite file URLs
+# default to NullPool on SQLAlchemy 2.0, so the queue pool is set explicitly and
+# kept small because SQLite serializes writers anyway.
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{settings.WIKIJS_MCP_DB}",
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=5,
+    max_overflow=5,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 class WikiJSClient:
     """Wiki.js GraphQL API client for handling requests."""
     
+    # Lifetime assumed for JWTs whose payload has no readable exp claim
+    JWT_TTL_SECONDS = 30 * 60
+    # Log in again this many seconds before the JWT expires
+    JWT_REFRESH_MARGIN_SECONDS = 30
+    # HTTP statuses and GraphQL error codes that mean the credentials were rejected
+    AUTH_ERROR_STATUSES = (401, 403)
+    AUTH_ERROR_CODES = ("UNAUTHENTICATED", "FORBIDDEN")
+    
     def __init__(self):
         self.base_url = settings.WIKIJS_API_URL.rstrip('/')
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # One shared client for every GraphQL request so TCP/TLS connections are
+        # reused, and concurrent requests can multiplex over HTTP/2 when offered
+        self.client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        )
         self.authenticated = False
+        self._auth_expires_at = 0.0
+    
+    def _jwt_expires_at(self, jwt_token: str) -> float:
+        """Return the monotonic time at which a JWT expires, from its exp claim if present."""
+        try:
+            payload_segment = jwt_token.split(".")[1]
+            payload_segment += "=" * (-len(payload_segment) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(payload_segment))
+            return time.monotonic() + (float(payload["exp"]) - time.time())
+        except (IndexError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Could not read JWT expiry, assuming {self.JWT_TTL_SECONDS}s: {e}")
+            return time.monotonic() + self.JWT_TTL_SECONDS
+    
+    def _invalidate_auth(self) -> None:
+        """Forget the current credentials so the next authenticate() sets them up again."""
+        self.authenticated = False
+        self._auth_expires_at = 0.0
         
     async def authenticate(self) -> bool:
-        """Set up authentication headers for GraphQL requests."""
+        """Set up authentication headers for GraphQL requests, reusing them while still valid."""
+        if self.authenticated and time.monotonic() < self._auth_expires_at - self.JWT_REFRESH_MARGIN_SECONDS:
+            return True
+        
         if settings.token:
             self.client.headers.update({
                 "Authorization": f"Bearer {settings.token}",
                 "Content-Type": "application/json"
             })
             self.authenticated = True
+            # API tokens do not expire on a schedule we know about
+            self._auth_expires_at = float("inf")
             return True
         elif settings.WIKIJS_USERNAME and settings.WIKIJS_PASSWORD:
             # For username/password, we need to login via GraphQL mutation
+            self.client.headers.pop("Authorization", None)
             try:
                 login_mutation = """
                 mutation($username: String!, $password: String!) {
@@ -139,6 +218,7 @@ class WikiJSClient:
                         "Content-Type": "application/json"
                     })
                     self.authenticated = True
+                    self._auth_expires_at = self._jwt_expires_at(jwt_token)
                     return True
                 else:
                     logger.error(f"Login failed: {response}")
@@ -148,6 +228,10 @@ class WikiJSClient:
                 return False
         return False
     
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and its pooled connections (called from server_lifespan)."""
+        await self.client.aclose()
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     async def graphql_request(self, query: str, variables: Dict = None) -> Dict:
         """Make GraphQL request to Wiki.js with retry for queries."""
@@ -173,11 +257,15 @@ class WikiJSClient:
             
             # Check for GraphQL errors
             if "errors" in data:
+                if any(err.get("extensions", {}).get("code") in self.AUTH_ERROR_CODES for err in data["errors"]):
+                    self._invalidate_auth()
                 error_msg = "; ".join([err.get("message", str(err)) for err in data["errors"]])
                 raise Exception(f"GraphQL error: {error_msg}")
             
             return data
         except httpx.HTTPStatusError as e:
+            if e.response.status_code in self.AUTH_ERROR_STATUSES:
+                self._invalidate_auth()
             logger.error(f"Wiki.js GraphQL HTTP error {e.response.status_code}: {e.response.text}")
             raise Exception(f"Wiki.js GraphQL HTTP error {e.response.status_code}: {e.response.text}")
         except httpx.RequestError as e:
@@ -187,6 +275,17 @@ class WikiJSClient:
 # Initialize client
 wikijs = WikiJSClient()
 
+P = ParamSpec("P")
+R = TypeVar("R")
+
+def requires_wiki(fn: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    """Authenticate with Wiki.js before running a tool that calls its API."""
+    @functools.wraps(fn)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        await wikijs.authenticate()
+        return await fn(*args, **kwargs)
+    return wrapper
+
 def get_db():
     """Get database session."""
     db = SessionLocal()
@@ -196,18 +295,125 @@ def get_db():
         db.close()
 
 def get_file_hash(file_path: str) -> str:
-    """Calculate SHA256 hash of file content."""
+    """Calculate SHA256 hash of file content, streaming it rather than reading it into memory."""
     try:
         with open(file_path, 'rb') as f:
-            return hashlib.sha256(f.read()).hexdigest()
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    except FileNotFoundError:
+        return ""
+
+# In-process cache of file hashes keyed by (path, mtime_ns, size)
+_HASH_CACHE_MAX_ENTRIES = 4096
+_hash_cache: "OrderedDict[tuple[str, int, int], str]" = OrderedDict()
+
+async def get_file_hash_cached(file_path: str) -> str:
+    """
+    Return the SHA256 hash of a file, skipping the rehash if it is unchanged since last seen.
+    
+    Hashes are cached in memory and in the file_hash_cache table, so unchanged
+    files are not rehashed after a server restart either.
+    """
+    abs_path = os.path.abspath(file_path)
+    try:
+        stat = os.stat(file_path)
     except FileNotFoundError:
+        await _forget_file_hash(abs_path)
         return ""
+    
+    key = (abs_path, stat.st_mtime_ns, stat.st_size)
+    cached_hash = _hash_cache.get(key)
+    if cached_hash is not None:
+        _hash_cache.move_to_end(key)
+        return cached_hash
+    
+    file_hash: Optional[str] = None
+    cache_available = True
+    try:
+        async with AsyncSessionLocal() as db:
+            cached = await db.get(FileHashCache, abs_path)
+            if cached and cached.mtime_ns == stat.st_mtime_ns and cached.size == stat.st_size:
+                file_hash = str(cached.hash)
+    except SQLAlchemyError as e:
+        logger.warning(f"File hash cache unavailable for {file_path}: {e}")
+        cache_available = False
+    
+    if file_hash is None:
+        # Hash off the event loop, without holding a database connection
+        file_hash = await asyncio.to_thread(get_file_hash, file_path)
+        if cache_available:
+            stmt = sqlite_insert(FileHashCache).values(
+                path=abs_path,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                hash=file_hash
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[FileHashCache.path],
+                set_={
+                    "mtime_ns": stmt.excluded.mtime_ns,
+                    "size": stmt.excluded.size,
+                    "hash": stmt.excluded.hash
+                }
+            )
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(stmt)
+                    await db.commit()
+            except SQLAlchemyError as e:
+                logger.warning(f"Failed to store file hash for {file_path}: {e}")
+    
+    _hash_cache[key] = file_hash
+    if len(_hash_cache) > _HASH_CACHE_MAX_ENTRIES:
+        _hash_cache.popitem(last=False)
+    return file_hash
+
+async def _forget_file_hash(abs_path: str) -> None:
+    """Remove the persisted hash of a file that no longer exists."""
+    try:
+        async with AsyncSessionLocal() as db:
+            # Only write when there is a row to remove
+            if await db.get(FileHashCache, abs_path) is None:
+                return
+            await db.execute(delete(FileHashCache).where(FileHashCache.path == abs_path))
+            await db.commit()
+    except SQLAlchemyError as e:
+        logger.warning(f"Failed to remove file hash for {abs_path}: {e}")
 
 def markdown_to_html(content: str) -> str:
     """Convert markdown content to HTML."""
     md = markdown.Markdown(extensions=['codehilite', 'fenced_code', 'tables'])
     return md.convert(content)
 
+# Response models for the high-frequency mapping tools, serialized directly by orjson
+@dataclass(slots=True)
+class LinkResult:
+    linked: bool
+    file_path: str
+    page_id: int
+    relationship: str
+
+@dataclass(slots=True)
+class MappingSummary:
+    file_path: str
+    page_id: int
+    relationship: str
+    last_updated: Optional[datetime.datetime]
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool result to a JSON string; naive datetimes are treated as UTC."""
+    return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC).decode()
+
+# Page paths known to exist, so nested page creation can skip re-creating parents
+_known_parents: set[str] = set()
+# Wiki.js PageDuplicateCreate error code
+_PAGE_DUPLICATE_ERROR_CODE = 6002
+
+_PATH_SANITIZE_RE = re.compile(r"[\s_]+")
+
+def _slug(value: str) -> str:
+    """Lowercase a title and collapse whitespace and underscores into dashes for page paths."""
+    return _PATH_SANITIZE_RE.sub("-", value.lower())
+
 def find_repository_root(start_path: str = None) -> Optional[str]:
     """Find the repository root by looking for .git directory or .wikijs_mcp file."""
     if start_path is None:
@@ -267,6 +473,154 @@ def extract_code_structure(file_path: str) -> Dict[str, Any]:
         logger.error(f"Error parsing {file_path}: {e}")
         return {'classes': [], 'functions': [], 'imports': []}
 
+# GraphQL documents shared by the tools below
+
+# Create a page and return its full details.
+_CREATE_PAGE_MUTATION = """
+mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
+    pages {
+        create(
+            title: $title,
+            content: $content,
+            description: $description,
+            path: $path,
+            locale: $locale,
+            editor: $editor,
+            isPublished: $isPublished,
+            isPrivate: $isPrivate,
+            tags: $tags
+        ) {
+            responseResult {
+                succeeded
+                errorCode
+                slug
+                message
+            }
+            page {
+                id
+                title
+                path
+                description
+                content
+                isPublished
+                createdAt
+                updatedAt
+            }
+        }
+    }
+}
+"""
+
+# Create a structural (root, section or parent) page.
+_CREATE_STRUCTURE_PAGE_MUTATION = """
+mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
+    pages {
+        create(
+            title: $title,
+            content: $content,
+            description: $description,
+            path: $path,
+            locale: $locale,
+            editor: $editor,
+            isPublished: $isPublished,
+            isPrivate: $isPrivate,
+            tags: $tags
+        ) {
+            responseResult {
+                succeeded
+                errorCode
+                slug
+                message
+            }
+            page {
+                id
+                title
+                path
+                description
+            }
+        }
+    }
+}
+"""
+
+# Create an auto-generated documentation page with tags.
+_CREATE_DOC_PAGE_MUTATION = """
+mutation($title: String!, $content: String!, $description: String!, $path: String!, $editor: String!, $isPrivate: Boolean!, $locale: String!, $tags: [String]!) {
+    pages {
+        create(title: $title, content: $content, description: $description, path: $path, editor: $editor, isPrivate: $isPrivate, locale: $locale, tags: $tags, isPublished: true) {
+            responseResult {
+                succeeded
+                errorCode
+                slug
+                message
+            }
+            page {
+                id
+                title
+                path
+                tags {
+                    id
+                    title
+                    tag
+                }
+            }
+        }
+    }
+}
+"""
+
+# Replace the content of an existing page.
+_UPDATE_PAGE_CONTENT_MUTATION = """
+mutation($id: Int!, $content: String!) {
+    pages {
+        update(id: $id, content: $content) {
+            responseResult {
+                succeeded
+                errorCode
+                slug
+                message
+            }
+            page {
+                id
+                title
+                path
+                tags {
+                    id
+                    title
+                    tag
+                }
+            }
+        }
+    }
+}
+"""
+
+# One aliased create field of a batched section mutation; formatted with the section index.
+_SECTION_CREATE_FIELD = """
+    s{i}: create(
+        title: $title{i},
+        content: $content{i},
+        description: $description{i},
+        path: $path{i},
+        locale: $locale,
+        editor: $editor,
+        isPublished: $isPublished,
+        isPrivate: $isPrivate,
+        tags: $tags
+    ) {{
+        responseResult {{
+            succeeded
+            errorCode
+            slug
+            message
+        }}
+        page {{
+            id
+            title
+            path
+        }}
+    }}"""
+
 # MCP Tools Implementation
 
 @mcp.tool()
@@ -867,45 +1221,42 @@ async def wikijs_link_file_to_page(file_path: str, page_id: int, relationship: s
         JSON string with link status
     """
     try:
-        db = get_db()
-        
         # Calculate file hash
-        file_hash = get_file_hash(file_path)
+        file_hash = await get_file_hash_cached(file_path)
         repo_root = find_repository_root(file_path)
         
-        # Create or update mapping
-        mapping = db.query(FileMapping).filter(FileMapping.file_path == file_path).first()
-        if mapping:
-            mapping.page_id = page_id
-            mapping.relationship_type = relationship
-            mapping.file_hash = file_hash
-            mapping.last_updated = datetime.datetime.utcnow()
-        else:
-            mapping = FileMapping(
-                file_path=file_path,
-                page_id=page_id,
-                relationship_type=relationship,
-                file_hash=file_hash,
-                repository_root=repo_root or ""
-            )
-            db.add(mapping)
+        # Create or update mapping in a single atomic upsert
+        stmt = sqlite_insert(FileMapping).values(
+            file_path=file_path,
+            page_id=page_id,
+            relationship_type=relationship,
+            file_hash=file_hash,
+            repository_root=repo_root or "",
+            last_updated=datetime.datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FileMapping.file_path],
+            set_={
+                "page_id": stmt.excluded.page_id,
+                "relationship_type": stmt.excluded.relationship_type,
+                "file_hash": stmt.excluded.file_hash,
+                "last_updated": stmt.excluded.last_updated
+            }
+        )
         
-        db.commit()
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
         
-        result = {
-            "linked": True,
-            "file_path": file_path,
-            "page_id": page_id,
-            "relationship": relationship
-        }
+        result = LinkResult(True, file_path, page_id, relationship)
         
         logger.info(f"Linked file {file_path} to page {page_id}")
-        return json.dumps(result)
+        return _dumps(result)
         
     except Exception as e:
         error_msg = f"Failed to link file to page: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
 async def wikijs_sync_file_docs(file_path: str, change_summary: str, snippet: str = None) -> str:
@@ -921,6 +1272,21 @@ async def wikijs_sync_file_docs(file_path: str, change_summary: str, snippet: st
         JSON string with sync status
     """
     try:
+        # Skip the sync entirely if the file matches the hash stored when it was linked
+        async with AsyncSessionLocal() as db:
+            mapping = (await db.execute(
+                select(FileMapping).where(FileMapping.file_path == file_path)
+            )).scalars().first()
+        
+        current_hash = await get_file_hash_cached(file_path)
+        if mapping and current_hash and mapping.file_hash == current_hash:
+            logger.info(f"File sync skipped, {file_path} is unchanged")
+            return _dumps({
+                "file_path": file_path,
+                "page_id": mapping.page_id,
+                "status": "unchanged"
+            })
+        
         await wikijs.authenticate()
         
         # For now, just log the sync request
@@ -939,14 +1305,15 @@ async def wikijs_sync_file_docs(file_path: str, change_summary: str, snippet: st
         
         logger.info(f"File sync requested: {file_path} - {change_summary}")
         
-        return json.dumps(sync_data)
+        return _dumps(sync_data)
         
     except Exception as e:
         error_msg = f"Failed to sync file docs: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
+@requires_wiki
 async def wikijs_generate_file_overview(file_path: str, include_functions: bool = True, include_classes: bool = True, include_dependencies: bool = True, include_examples: bool = False, target_page_id: int = None) -> str:
     """
     Create or update a structured overview page for a file.
@@ -963,73 +1330,50 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
         JSON string with overview page details
     """
     try:
-        await wikijs.authenticate()
-        
         # For now, create a simple overview page
         # In a full implementation, this would:
         # 1. Parse the source file
         # 2. Extract functions, classes, dependencies
         # 3. Generate structured documentation
         
+        now = datetime.datetime.now()
         file_name = os.path.basename(file_path)
         file_ext = os.path.splitext(file_name)[1]
         
-        content = f"# {file_name}\n\n"
-        content += f"Documentation for `{file_path}`\n\n"
-        content += f"**File Type:** {file_ext}\n"
-        content += f"**Last Updated:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+        parts = [
+            f"# {file_name}\n\n",
+            f"Documentation for `{file_path}`\n\n",
+            f"**File Type:** {file_ext}\n",
+            f"**Last Updated:** {now.strftime('%Y-%m-%d %H:%M')}\n\n"
+        ]
         
         if include_functions:
-            content += "## Functions\n\n*Function documentation will be generated here.*\n\n"
+            parts.append("## Functions\n\n*Function documentation will be generated here.*\n\n")
         
         if include_classes:
-            content += "## Classes\n\n*Class documentation will be generated here.*\n\n"
+            parts.append("## Classes\n\n*Class documentation will be generated here.*\n\n")
         
         if include_dependencies:
-            content += "## Dependencies\n\n*Import and dependency information will be listed here.*\n\n"
+            parts.append("## Dependencies\n\n*Import and dependency information will be listed here.*\n\n")
         
         if include_examples:
-            content += "## Examples\n\n*Usage examples will be provided here.*\n\n"
+            parts.append("## Examples\n\n*Usage examples will be provided here.*\n\n")
         
-        content += "---\n*This documentation was auto-generated by the Wiki.js MCP server.*"
+        parts.append("---\n*This documentation was auto-generated by the Wiki.js MCP server.*")
+        content = "".join(parts)
         
         # Create or update page using direct GraphQL
         if target_page_id:
             # Update existing page
-            update_mutation = """
-            mutation($id: Int!, $content: String!) {
-                pages {
-                    update(id: $id, content: $content) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                        }
-                        page {
-                            id
-                            title
-                            path
-                            tags {
-                                id
-                                title
-                                tag
-                            }
-                        }
-                    }
-                }
-            }
-            """
-            
             variables = {
                 "id": target_page_id,
                 "content": content
             }
             
-            response = await wikijs.graphql_request_without_retry(update_mutation, variables)
+            response = await wikijs.graphql_request_without_retry(_UPDATE_PAGE_CONTENT_MUTATION, variables)
             
             if not response or "data" not in response:
-                return json.dumps({"error": "Invalid response from Wiki.js API"})
+                return _dumps({"error": "Invalid response from Wiki.js API"})
             
             update_result = response.get("data", {}).get("pages", {}).get("update", {})
             response_result = update_result.get("responseResult", {})
@@ -1042,7 +1386,7 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
                 if page_data.get("tags"):
                     page_tags = [tag.get("tag", "") for tag in page_data.get("tags", []) if tag.get("tag")]
                 
-                return json.dumps({
+                return _dumps({
                     "pageId": page_data.get("id"),
                     "title": page_data.get("title"),
                     "path": page_data.get("path"),
@@ -1051,34 +1395,9 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
                 })
             else:
                 error_msg = response_result.get("message", "Unknown error")
-                return json.dumps({"error": f"Failed to update page: {error_msg}"})
+                return _dumps({"error": f"Failed to update page: {error_msg}"})
         else:
             # Create new page
-            create_mutation = """
-            mutation($title: String!, $content: String!, $description: String!, $path: String!, $editor: String!, $isPrivate: Boolean!, $locale: String!, $tags: [String]!) {
-                pages {
-                    create(title: $title, content: $content, description: $description, path: $path, editor: $editor, isPrivate: $isPrivate, locale: $locale, tags: $tags, isPublished: true) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                        }
-                        page {
-                            id
-                            title
-                            path
-                            tags {
-                                id
-                                title
-                                tag
-                            }
-                        }
-                    }
-                }
-            }
-            """
-            
             # Create safe path using slugify
             safe_path = slugify(file_path, separator='')
             
@@ -1096,10 +1415,10 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
                 "tags": ["documentation", "auto-generated"]
             }
             
-            response = await wikijs.graphql_request_without_retry(create_mutation, variables)
+            response = await wikijs.graphql_request_without_retry(_CREATE_DOC_PAGE_MUTATION, variables)
             
             if not response or "data" not in response:
-                return json.dumps({"error": "Invalid response from Wiki.js API"})
+                return _dumps({"error": "Invalid response from Wiki.js API"})
             
             create_result = response.get("data", {}).get("pages", {}).get("create", {})
             response_result = create_result.get("responseResult", {})
@@ -1112,7 +1431,7 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
                 if page_data.get("tags"):
                     page_tags = [tag.get("tag", "") for tag in page_data.get("tags", []) if tag.get("tag")]
                 
-                return json.dumps({
+                return _dumps({
                     "pageId": page_data.get("id"),
                     "title": page_data.get("title"),
                     "path": page_data.get("path"),
@@ -1122,14 +1441,15 @@ async def wikijs_generate_file_overview(file_path: str, include_functions: bool
                 })
             else:
                 error_msg = response_result.get("message", "Unknown error")
-                return json.dumps({"error": f"Failed to create page: {error_msg}"})
+                return _dumps({"error": f"Failed to create page: {error_msg}"})
         
     except Exception as e:
         error_msg = f"Failed to generate file overview: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
+@requires_wiki
 async def wikijs_bulk_update_project_docs(summary: str, affected_files: list, context: str, auto_create_missing: bool = True) -> str:
     """
     Batch update pages for large changes across multiple files.
@@ -1144,51 +1464,28 @@ async def wikijs_bulk_update_project_docs(summary: str, affected_files: list, co
         JSON string with bulk update results
     """
     try:
-        await wikijs.authenticate()
+        now = datetime.datetime.now()
         
-        # Create a summary page for the bulk update
-        summary_content = f"# Project Update Summary\n\n"
-        summary_content += f"**Date:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-        summary_content += f"**Summary:** {summary}\n\n"
-        summary_content += f"**Context:** {context}\n\n"
-        summary_content += f"## Affected Files ({len(affected_files)})\n\n"
+        # Drop repeated paths while keeping the order they were reported in
+        unique_files = list(dict.fromkeys(affected_files))
         
-        for file_path in affected_files:
-            summary_content += f"- `{file_path}`\n"
-        
-        summary_content += "\n---\n*This summary was auto-generated by the Wiki.js MCP server.*"
+        # Create a summary page for the bulk update
+        summary_content = "".join([
+            "# Project Update Summary\n\n",
+            f"**Date:** {now.strftime('%Y-%m-%d %H:%M')}\n",
+            f"**Summary:** {summary}\n\n",
+            f"**Context:** {context}\n\n",
+            f"## Affected Files ({len(unique_files)})\n\n",
+            *(f"- `{file_path}`\n" for file_path in unique_files),
+            "\n---\n*This summary was auto-generated by the Wiki.js MCP server.*"
+        ])
         
         # Create summary page using direct GraphQL
-        create_mutation = """
-        mutation($title: String!, $content: String!, $description: String!, $path: String!, $editor: String!, $isPrivate: Boolean!, $locale: String!, $tags: [String]!) {
-            pages {
-                create(title: $title, content: $content, description: $description, path: $path, editor: $editor, isPrivate: $isPrivate, locale: $locale, tags: $tags, isPublished: true) {
-                    responseResult {
-                        succeeded
-                        errorCode
-                        slug
-                        message
-                    }
-                    page {
-                        id
-                        title
-                        path
-                        tags {
-                            id
-                            title
-                            tag
-                        }
-                    }
-                }
-            }
-        }
-        """
-        
         # Create safe timestamp for path
-        timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M')
+        timestamp = now.strftime('%Y%m%d%H%M')
         
         variables = {
-            "title": f"Update Summary - {datetime.datetime.now().strftime('%Y-%m-%d')}",
+            "title": f"Update Summary - {now.strftime('%Y-%m-%d')}",
             "content": summary_content,
             "description": f"Bulk update summary: {summary}",
             "path": f"updates{timestamp}",
@@ -1198,10 +1495,10 @@ async def wikijs_bulk_update_project_docs(summary: str, affected_files: list, co
             "tags": ["bulk-update", "automated"]
         }
         
-        response = await wikijs.graphql_request_without_retry(create_mutation, variables)
+        response = await wikijs.graphql_request_without_retry(_CREATE_DOC_PAGE_MUTATION, variables)
         
         if not response or "data" not in response:
-            return json.dumps({"error": "Invalid response from Wiki.js API"})
+            return _dumps({"error": "Invalid response from Wiki.js API"})
         
         create_result = response.get("data", {}).get("pages", {}).get("create", {})
         response_result = create_result.get("responseResult", {})
@@ -1217,35 +1514,52 @@ async def wikijs_bulk_update_project_docs(summary: str, affected_files: list, co
             summary_data["tags"] = summary_tags
         else:
             error_msg = response_result.get("message", "Unknown error")
-            return json.dumps({"error": f"Failed to create summary page: {error_msg}"})
+            return _dumps({"error": f"Failed to create summary page: {error_msg}"})
+        
+        # Find linked pages for all affected files in one query rather than one per file
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(FileMapping).where(FileMapping.file_path.in_(unique_files))
+            )).scalars().all()
+        by_path = {row.file_path: row for row in rows}
+        
+        linked_pages = []
+        missing_files = []
+        for file_path in unique_files:
+            mapping = by_path.get(file_path)
+            if mapping:
+                linked_pages.append({"file_path": file_path, "page_id": mapping.page_id})
+            else:
+                missing_files.append(file_path)
         
         # For now, just log the bulk update
-        # In a full implementation, this would:
-        # 1. Find all linked pages for affected files
-        # 2. Update each page with change information
-        # 3. Create pages for new files if auto_create_missing is True
+        # In a full implementation, this would also:
+        # 1. Update each linked page with change information
+        # 2. Create pages for missing files if auto_create_missing is True
         
         bulk_data = {
             "summary": summary,
-            "affected_files": affected_files,
+            "affected_files": unique_files,
             "context": context,
             "auto_create_missing": auto_create_missing,
             "summary_page": summary_data,
-            "total_files": len(affected_files),
+            "total_files": len(unique_files),
+            "linked_pages": linked_pages,
+            "missing_files": missing_files,
             "updated": 0,
             "created": 0,
             "errors": [],
             "status": "logged"
         }
         
-        logger.info(f"Bulk update requested: {summary} - {len(affected_files)} files affected")
+        logger.info(f"Bulk update requested: {summary} - {len(unique_files)} files affected")
         
-        return json.dumps(bulk_data)
+        return _dumps(bulk_data)
         
     except Exception as e:
         error_msg = f"Failed to bulk update project docs: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
 async def wikijs_manage_collections(collection_name: str, description: str = None, space_ids: List[int] = None) -> str:
@@ -1273,12 +1587,12 @@ async def wikijs_manage_collections(collection_name: str, description: str = Non
         }
         
         logger.info(f"Managed collection: {collection_name}")
-        return json.dumps(result)
+        return _dumps(result)
         
     except Exception as e:
         error_msg = f"Failed to manage collection: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
 async def wikijs_connection_status() -> str:
@@ -1292,8 +1606,11 @@ async def wikijs_connection_status() -> str:
         auth_success = await wikijs.authenticate()
         
         if auth_success:
-            # Test with a simple API call
-            response = await wikijs.graphql_request("query { pages { list { id } } }")
+            # Probe with a single-page list: it goes through Wiki.js permission checks,
+            # so a rejected token fails here, but transfers at most one page ID
+            response = await wikijs.graphql_request("query { pages { list(limit: 1) { id } } }")
+            if not isinstance(response.get("data", {}).get("pages", {}).get("list"), list):
+                raise Exception(f"Unexpected health check response: {response}")
             
             result = {
                 "connected": True,
@@ -1310,7 +1627,7 @@ async def wikijs_connection_status() -> str:
                 "status": "authentication_failed"
             }
         
-        return json.dumps(result)
+        return _dumps(result)
         
     except Exception as e:
         result = {
@@ -1320,7 +1637,7 @@ async def wikijs_connection_status() -> str:
             "error": str(e),
             "status": "connection_failed"
         }
-        return json.dumps(result)
+        return _dumps(result)
 
 @mcp.tool()
 async def wikijs_repository_context() -> str:
@@ -1332,42 +1649,44 @@ async def wikijs_repository_context() -> str:
     """
     try:
         repo_root = find_repository_root()
-        db = get_db()
         
-        # Get repository context from database
-        context = db.query(RepositoryContext).filter(
-            RepositoryContext.root_path == repo_root
-        ).first()
-        
-        # Get file mappings for this repository
-        mappings = db.query(FileMapping).filter(
-            FileMapping.repository_root == repo_root
-        ).all()
+        async with AsyncSessionLocal() as db:
+            # Get repository context from database
+            context = (await db.execute(
+                select(RepositoryContext).where(RepositoryContext.root_path == repo_root)
+            )).scalars().first()
+            
+            # Load the most recent mappings; the window count is computed before
+            # LIMIT, so the same statement also returns the repository total
+            rows = (await db.execute(
+                select(FileMapping, func.count().over().label("total"))
+                .where(FileMapping.repository_root == repo_root)
+                .order_by(FileMapping.last_updated.desc())
+                .limit(10)
+            )).all()
+            mappings = [row.FileMapping for row in rows]
+            total = rows[0].total if rows else 0
         
         result = {
             "repository_root": repo_root,
             "space_name": context.space_name if context else settings.DEFAULT_SPACE_NAME,
             "space_id": context.space_id if context else None,
-            "mapped_files": len(mappings),
+            "mapped_files": total,
             "mappings": [
-                {
-                    "file_path": m.file_path,
-                    "page_id": m.page_id,
-                    "relationship": m.relationship_type,
-                    "last_updated": m.last_updated.isoformat() if m.last_updated else None
-                }
-                for m in mappings[:10]  # Limit to first 10 for brevity
+                MappingSummary(m.file_path, m.page_id, m.relationship_type, m.last_updated)
+                for m in mappings
             ]
         }
         
-        return json.dumps(result)
+        return _dumps(result)
         
     except Exception as e:
         error_msg = f"Failed to get repository context: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
+@requires_wiki
 async def wikijs_create_repo_structure(repo_name: str, description: str = None, sections: list = None) -> str:
     """
     Create a complete repository documentation structure with nested pages.
@@ -1381,56 +1700,25 @@ async def wikijs_create_repo_structure(repo_name: str, description: str = None,
         JSON string with created structure details
     """
     try:
-        await wikijs.authenticate()
-        
         if not sections:
             sections = ["Overview", "API", "Components", "Deployment"]
         
+        repo_slug = _slug(repo_name)
+        
         # Create root repository page
         root_content = f"# {repo_name}\n\n"
         if description:
             root_content += f"{description}\n\n"
         root_content += "## Sections\n\n"
         for section in sections:
-            root_content += f"- [{section}]({repo_name.lower()}/{section.lower()})\n"
+            root_content += f"- [{section}]({repo_slug}/{_slug(section)})\n"
         
         # Create root page directly
-        root_mutation = """
-        mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
-            pages {
-                create(
-                    title: $title,
-                    content: $content,
-                    description: $description,
-                    path: $path,
-                    locale: $locale,
-                    editor: $editor,
-                    isPublished: $isPublished,
-                    isPrivate: $isPrivate,
-                    tags: $tags
-                ) {
-                    responseResult {
-                        succeeded
-                        errorCode
-                        slug
-                        message
-                    }
-                    page {
-                        id
-                        title
-                        path
-                        description
-                    }
-                }
-            }
-        }
-        """
-        
         root_variables = {
             "title": repo_name,
             "content": root_content,
             "description": description or f"Documentation for {repo_name}",
-            "path": repo_name.lower().replace(" ", "-"),
+            "path": repo_slug,
             "locale": settings.DEFAULT_LOCALE,
             "editor": "markdown",
             "isPublished": True,
@@ -1438,71 +1726,49 @@ async def wikijs_create_repo_structure(repo_name: str, description: str = None,
             "tags": []
         }
         
-        root_response = await wikijs.graphql_request_without_retry(root_mutation, root_variables)
+        root_response = await wikijs.graphql_request_without_retry(_CREATE_STRUCTURE_PAGE_MUTATION, root_variables)
         
         if not root_response or "data" not in root_response:
-            return json.dumps({"error": "Invalid response from Wiki.js API"})
+            return _dumps({"error": "Invalid response from Wiki.js API"})
         
         root_result = root_response.get("data", {}).get("pages", {}).get("create", {})
         root_response_result = root_result.get("responseResult", {})
         
         if not root_response_result.get("succeeded"):
             error_msg = root_response_result.get("message", "Unknown error")
-            return json.dumps({"error": f"Failed to create root page: {error_msg}"})
+            return _dumps({"error": f"Failed to create root page: {error_msg}"})
         
         root_data = root_result.get("page", {})
         
-        # Create section pages
+        # Create all section pages in a single mutation, one aliased create per section
+        variable_defs = ["$locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!"]
+        create_fields = []
+        section_variables = {
+            "locale": settings.DEFAULT_LOCALE,
+            "editor": "markdown",
+            "isPublished": True,
+            "isPrivate": False,
+            "tags": []
+        }
+        for i, section in enumerate(sections):
+            variable_defs.append(f"$title{i}: String!, $content{i}: String!, $description{i}: String!, $path{i}: String!")
+            create_fields.append(_SECTION_CREATE_FIELD.format(i=i))
+            section_variables.update({
+                f"title{i}": section,
+                f"content{i}": f"# {section}\n\nThis section contains {section.lower()} documentation for {repo_name}.\n\n## Contents\n\n*Content will be added here.*",
+                f"description{i}": f"Section: {section}",
+                f"path{i}": f"{repo_slug}/{_slug(section)}"
+            })
+
+        section_mutation = f"mutation({', '.join(variable_defs)}) {{\n    pages {{{''.join(create_fields)}\n    }}\n}}"
+
+        section_response = await wikijs.graphql_request_without_retry(section_mutation, section_variables)
+        sections_result = section_response.get("data", {}).get("pages", {}) or {}
+
         created_sections = []
-        for section in sections:
-            section_content = f"# {section}\n\nThis section contains {section.lower()} documentation for {repo_name}.\n\n## Contents\n\n*Content will be added here.*"
-            
-            # Create section page directly
-            section_mutation = """
-            mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
-                pages {
-                    create(
-                        title: $title,
-                        content: $content,
-                        description: $description,
-                        path: $path,
-                        locale: $locale,
-                        editor: $editor,
-                        isPublished: $isPublished,
-                        isPrivate: $isPrivate,
-                        tags: $tags
-                    ) {
-                        responseResult {
-                            succeeded
-                            errorCode
-                            slug
-                            message
-                        }
-                        page {
-                            id
-                            title
-                            path
-                        }
-                    }
-                }
-            }
-            """
-            
-            section_variables = {
-                "title": section,
-                "content": section_content,
-                "description": f"Section: {section}",
-                "path": f"{repo_name.lower().replace(' ', '-')}/{section.lower()}",
-                "locale": settings.DEFAULT_LOCALE,
-                "editor": "markdown",
-                "isPublished": True,
-                "isPrivate": False,
-                "tags": []
-            }
-            
-            section_response = await wikijs.graphql_request_without_retry(section_mutation, section_variables)
-            section_result = section_response.get("data", {}).get("pages", {}).get("create", {})
-            
+        for i, section in enumerate(sections):
+            section_result = sections_result.get(f"s{i}") or {}
+
             if section_result.get("responseResult", {}).get("succeeded"):
                 section_data = section_result.get("page", {})
                 created_sections.append({
@@ -1511,7 +1777,7 @@ async def wikijs_create_repo_structure(repo_name: str, description: str = None,
                     "path": section_data.get("path")
                 })
         
-        return json.dumps({
+        return _dumps({
             "repo_name": repo_name,
             "description": description,
             "root_page": root_data,
@@ -1523,9 +1789,10 @@ async def wikijs_create_repo_structure(repo_name: str, description: str = None,
     except Exception as e:
         error_msg = f"Failed to create repository structure: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
+@requires_wiki
 async def wikijs_create_nested_page(title: str, content: str, parent_path: str, create_parent_if_missing: bool = True) -> str:
     """
     Create a nested page using hierarchical paths (e.g., "repo/api/endpoints").
@@ -1540,51 +1807,18 @@ async def wikijs_create_nested_page(title: str, content: str, parent_path: str,
         JSON string with page details
     """
     try:
-        await wikijs.authenticate()
-        
         # Build the full path
-        full_path = f"{parent_path}/{title.lower().replace(' ', '-').replace('_', '-')}"
+        full_path = f"{parent_path}/{_slug(title)}"
         
         # Check if parent exists and create if needed
         parent_exists = False
-        if create_parent_if_missing:
+        if create_parent_if_missing and parent_path not in _known_parents:
             # Try to create parent page if it doesn't exist
             try:
                 parent_title = parent_path.split("/")[-1].replace("-", " ").title()
                 parent_content = f"# {parent_title}\n\nParent page for {title}"
                 
                 # Use proper create mutation with all required parameters
-                parent_mutation = """
-                mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
-                    pages {
-                        create(
-                            title: $title,
-                            content: $content,
-                            description: $description,
-                            path: $path,
-                            locale: $locale,
-                            editor: $editor,
-                            isPublished: $isPublished,
-                            isPrivate: $isPrivate,
-                            tags: $tags
-                        ) {
-                            responseResult {
-                                succeeded
-                                errorCode
-                                slug
-                                message
-                            }
-                            page {
-                                id
-                                title
-                                path
-                                isPublished
-                            }
-                        }
-                    }
-                }
-                """
-                
                 parent_variables = {
                     "title": parent_title,
                     "content": parent_content,
@@ -1597,51 +1831,20 @@ async def wikijs_create_nested_page(title: str, content: str, parent_path: str,
                     "tags": []
                 }
                 
-                parent_response = await wikijs.graphql_request_without_retry(parent_mutation, parent_variables)
+                parent_response = await wikijs.graphql_request_without_retry(_CREATE_STRUCTURE_PAGE_MUTATION, parent_variables)
                 parent_result = parent_response.get("data", {}).get("pages", {}).get("create", {})
+                parent_response_result = parent_result.get("responseResult", {})
                 
-                if parent_result.get("responseResult", {}).get("succeeded"):
+                if parent_response_result.get("succeeded"):
                     parent_exists = True
+                    _known_parents.add(parent_path)
+                elif parent_response_result.get("errorCode") == _PAGE_DUPLICATE_ERROR_CODE:
+                    _known_parents.add(parent_path)
             except:
                 # Parent might already exist, continue
                 pass
         
         # Create the nested page with proper mutation
-        create_mutation = """
-        mutation($title: String!, $content: String!, $description: String!, $path: String!, $locale: String!, $editor: String!, $isPublished: Boolean!, $isPrivate: Boolean!, $tags: [String]!) {
-            pages {
-                create(
-                    title: $title,
-                    content: $content,
-                    description: $description,
-                    path: $path,
-                    locale: $locale,
-                    editor: $editor,
-                    isPublished: $isPublished,
-                    isPrivate: $isPrivate,
-                    tags: $tags
-                ) {
-                    responseResult {
-                        succeeded
-                        errorCode
-                        slug
-                        message
-                    }
-                    page {
-                        id
-                        title
-                        path
-                        description
-                        content
-                        isPublished
-                        createdAt
-                        updatedAt
-                    }
-                }
-            }
-        }
-        """
-        
         variables = {
             "title": title,
             "content": content,
@@ -1654,17 +1857,18 @@ async def wikijs_create_nested_page(title: str, content: str, parent_path: str,
             "tags": []
         }
         
-        response = await wikijs.graphql_request_without_retry(create_mutation, variables)
+        response = await wikijs.graphql_request_without_retry(_CREATE_PAGE_MUTATION, variables)
         
         if not response or "data" not in response:
-            return json.dumps({"error": "Invalid response from Wiki.js API"})
+            return _dumps({"error": "Invalid response from Wiki.js API"})
         
         create_result = response.get("data", {}).get("pages", {}).get("create", {})
         response_result = create_result.get("responseResult", {})
         
         if response_result.get("succeeded"):
             page_data = create_result.get("page", {})
-            return json.dumps({
+            _known_parents.add(full_path)
+            return _dumps({
                 "pageId": page_data.get("id"),
                 "title": page_data.get("title"),
                 "path": page_data.get("path"),
@@ -1680,12 +1884,12 @@ async def wikijs_create_nested_page(title: str, content: str, parent_path: str,
             })
         else:
             error_msg = response_result.get("message", "Unknown error")
-            return json.dumps({"error": f"Failed to create nested page: {error_msg}"})
+            return _dumps({"error": f"Failed to create nested page: {error_msg}"})
         
     except Exception as e:
         error_msg = f"Failed to create nested page: {str(e)}"
         logger.error(error_msg)
-        return json.dumps({"error": error_msg})
+        return _dumps({"error": error_msg})
 
 @mcp.tool()
 async def wikijs_get_page_children(page_id: int = None, page_path: str = None) -> str:
@@ -1932,6 +2136,9 @@ async def wikijs_delete_page(page_id: int = None, page_path: str = None, remove_
     try:
         await wikijs.authenticate()
         
+        # Path of the deleted page, known only when it was resolved from page_path
+        deleted_path: Optional[str] = None
+        
         # Get page ID if only path provided
         if page_path and not page_id:
             get_query = """
@@ -1952,6 +2159,7 @@ async def wikijs_delete_page(page_id: int = None, page_path: str = None, remove_
                 return json.dumps({"error": f"Page with path '{page_path}' not found"})
             
             page_id = page_data["id"]
+            deleted_path = page_data["path"]
         
         if not page_id:
             return json.dumps({"error": "Either page_id or page_path must be provided"})
@@ -1981,6 +2189,12 @@ async def wikijs_delete_page(page_id: int = None, page_path: str = None, remove_
         response_result = delete_result.get("responseResult", {})
         
         if response_result.get("succeeded"):
+            if deleted_path:
+                _known_parents.discard(deleted_path)
+            else:
+                # Deleted by ID, so the path is unknown and no cached parent can be trusted
+                _known_parents.clear()
+            
             result = {
                 "pageId": page_id,
                 "status": "deleted",
@@ -2139,6 +2353,7 @@ async def wikijs_batch_delete_pages(
                 response_result = delete_result.get("responseResult", {})
                 
                 if response_result.get("succeeded"):
+                    _known_parents.discard(page["path"])
                     deleted_pages.append({
                         "pageId": page["id"],
                         "title": page["title"],
@@ -2313,6 +2528,7 @@ async def wikijs_delete_hierarchy(
                 response_result = delete_result.get("responseResult", {})
                 
                 if response_result.get("succeeded"):
+                    _known_parents.discard(page["path"])
                     deleted_pages.append({
                         "pageId": page["id"],
                         "title": page["title"],
@@ -2382,13 +2598,29 @@ async def wikijs_cleanup_orphaned_mappings() -> str:
         await wikijs.authenticate()
         db = get_db()
         
+        # Drop persisted hashes of files that no longer exist, checking the
+        # filesystem off the event loop
+        hash_paths = [path for (path,) in db.query(FileHashCache.path).all()]
+        missing_paths = await asyncio.to_thread(
+            lambda: [path for path in hash_paths if not os.path.exists(path)]
+        )
+        if missing_paths:
+            # Delete in batches to stay under SQLite's bound-parameter limit
+            for start in range(0, len(missing_paths), 500):
+                db.query(FileHashCache).filter(
+                    FileHashCache.path.in_(missing_paths[start:start + 500])
+                ).delete(synchronize_session=False)
+            db.commit()
+        pruned_hashes = len(missing_paths)
+        
         # Get all file mappings
         mappings = db.query(FileMapping).all()
         
         if not mappings:
             return json.dumps({
                 "message": "No file mappings found",
-                "cleaned_count": 0
+                "cleaned_count": 0,
+                "pruned_file_hashes": pruned_hashes
             })
         
         # Check which pages still exist
@@ -2443,6 +2675,7 @@ async def wikijs_cleanup_orphaned_mappings() -> str:
             "orphaned_mappings": len(orphaned_mappings),
             "cleaned_count": len(orphaned_mappings),
             "orphaned_details": orphaned_mappings,
+            "pruned_file_hashes": pruned_hashes,
             "status": "completed"
         }
         